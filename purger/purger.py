@@ -8,23 +8,31 @@ are encountered.
 """
 
 # Standard imports
+import collections
+import concurrent.futures
 import datetime
-import glob
+import fnmatch
 import json
 import logging
 import os
 import pathlib
+import re
 import shutil
+import stat
 import sys
 import traceback
 import zipfile
 
 # Third-party imports
 import boto3
+from boto3.s3.transfer import TransferConfig
 import botocore
-import fsspec
-from netCDF4 import Dataset
+from botocore.config import Config
+import h5py
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Constants
 ARCHIVE_DIR = pathlib.Path("/mnt/data/archive")
@@ -34,6 +42,28 @@ DATASETS = {
     "terra": "MODIS_T-JPL-L2P-v2019.0", 
     "viirs": "VIIRS_NPP-JPL-L2P-v2016.2"
 }
+CMR_BATCH_SIZE = 50    # Granule names per CMR search request
+CMR_WORKERS = 16
+GLOB_MAGIC = re.compile(r"[*?[]")    # Characters that make a path component a pattern
+NRT_TOKEN = re.compile(r"[._]NRT[._]")    # Quicklook token in OBPG file names
+DELETE_BATCH_SIZE = 1000    # Maximum keys per S3 DeleteObjects request
+PARALLEL_STAT_MIN = 64
+# File list entry with modification time and type captured when directory was scanned
+FileEntry = collections.namedtuple("FileEntry", ["path", "name", "mtime", "is_dir"])
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=64 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=16,
+    use_threads=True,
+    io_chunksize=1024 * 1024
+)
+
+# Cached across warm Lambda invocations
+_TOPIC_ARN = os.environ.get("SNS_TOPIC_ARN")    # Set at deploy time; looked up on first use otherwise
+_CLIENT_CONFIG = Config(max_pool_connections=64, retries={"mode": "adaptive", "max_attempts": 10}, tcp_keepalive=True)
+_S3 = boto3.client("s3", config=_CLIENT_CONFIG)
+_SNS = boto3.client("sns", config=_CLIENT_CONFIG)
+_SSM = boto3.client("ssm", region_name="us-west-2", config=_CLIENT_CONFIG)
 
 # Functions
 def purger_handler(event, context):
@@ -62,13 +92,14 @@ def get_logger():
     """Return a formatted logger object."""
     
     # Remove AWS Lambda logger
-    logger = logging.getLogger()
-    for handler in logger.handlers:
-        logger.removeHandler(handler)
+    logging.getLogger().handlers.clear()
     
     # Create a Logger object and set log level
     logger = logging.getLogger(__name__)
     logger.setLevel(logging.DEBUG)
+    
+    # Logger persists across warm invocations so only configure it once
+    if logger.handlers: return logger
 
     # Create a handler to console and set level
     console_handler = logging.StreamHandler()
@@ -112,9 +143,8 @@ def purge_efs(prefix, logger):
 def read_config(prefix):
     """Read in JSON config file for AWS Batch job submission."""
     
-    s3_url = f"s3://{prefix}/config/purger.json"
-    with fsspec.open(s3_url, mode='r') as fh:
-        purger_dict = json.load(fh)
+    response = _S3.get_object(Bucket=prefix, Key="config/purger.json")
+    purger_dict = json.loads(response["Body"].read())
     return purger_dict
 
 def generate_file_lists(purger_dict, logger):
@@ -123,153 +153,319 @@ def generate_file_lists(purger_dict, logger):
         
     # Gather list of files past threshold value
     today = datetime.datetime.now(datetime.timezone.utc)
+    today_ts = today.timestamp()
+    
+    # Group glob patterns of every path by the directory they match against so
+    # that each directory is only scanned once
+    scans = {}
     for component, paths in purger_dict.items():
         for path_name, path_dict in paths.items():
             purger_dict[component][path_name]["file_list"] = []
-            # Locate files and filter by threshold value
+            threshold_seconds = path_dict["threshold"] * 60 * 60
+            patterns = {}
             for glob_op in path_dict["glob_ops"]:
-                
-                files = glob.glob(f"{path_dict['path']}/{glob_op}")
-                for file in files:
-                    file_mod = datetime.datetime.fromtimestamp(os.path.getmtime(file), datetime.timezone.utc)
-                    file_age = today - file_mod
-                    age_hours = (file_age.total_seconds()) / (60 * 60)
-                    if (age_hours >= path_dict["threshold"]):
-                        purger_dict[component][path_name]["file_list"].append(pathlib.Path(file))
+                glob_dir, glob_name = os.path.split(glob_op)
+                patterns.setdefault(glob_dir, []).append(glob_name)
+            for glob_dir, glob_names in patterns.items():
+                scans.setdefault((path_dict["path"], glob_dir), []).append((component, path_name, glob_names, threshold_seconds))
+    
+    # Locate files in a single pass over each directory and filter by threshold
+    # value, scanning independent directories concurrently; stat calls for 
+    # large directories share one bounded pool rather than one per directory
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor, \
+         concurrent.futures.ThreadPoolExecutor(max_workers=32) as stat_executor:
+        results = executor.map(lambda scan: scan_dirs(*scan[0], scan[1], today_ts, stat_executor), scans.items())
+        for file_lists in results:
+            for (component, path_name), file_list in file_lists:
+                purger_dict[component][path_name]["file_list"].extend(file_list)
+    
+    # Directory patterns of a path can resolve to the same directory (e.g. 'd[12]' and 'd[!1]')
+    for component, paths in purger_dict.items():
+        for path_name, path_dict in paths.items():
+            path_dict["file_list"] = [*{entry.path: entry for entry in path_dict["file_list"]}.values()]
     
     # Determine status of holding tank files and update list
     sort_holding_tank(purger_dict, today, logger)
  
+def scan_dirs(root, glob_dir, targets, now, stat_executor):
+    """Scan directories matching glob directory pattern below root and return
+    list of ((component, path name), file list) for targets."""
+    
+    return [file_list for dir_path in iter_dirs(root, glob_dir) for file_list in scan_dir(dir_path, targets, now, stat_executor).items()]
+ 
+def iter_dirs(root, glob_dir):
+    """Yield directories below root that match the glob directory pattern,
+    scanning only path components that contain wildcards."""
+    
+    dirs = [root]
+    for part in pathlib.PurePath(glob_dir).parts:
+        if not GLOB_MAGIC.search(part):
+            dirs = [os.path.join(dir_path, part) for dir_path in dirs]
+            continue
+        matcher = compile_patterns([part])
+        subdirs = []
+        for dir_path in dirs:
+            # Missing or unreadable directories are skipped, as with glob
+            try:
+                with os.scandir(dir_path) as entries:
+                    subdirs.extend(entry.path for entry in entries if matcher(entry.name) and is_dir_entry(entry))
+            except OSError:
+                continue
+        dirs = subdirs
+    yield from dirs
+ 
+def is_dir_entry(entry):
+    """Return whether directory entry is a directory, treating entries that
+    cannot be checked as files, as with glob."""
+    
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+ 
+def scan_dir(dir_path, targets, now, stat_executor):
+    """Scan a directory once and return FileEntry lists keyed by component and
+    path name for files that match each target's glob patterns and threshold.
+    
+    Targets are (component, path name, glob patterns, minimum age in seconds)
+    tuples. Stat calls for large directories run on stat_executor.
+    """
+    
+    # Stat literal file names directly when there is nothing to match
+    if not any(GLOB_MAGIC.search(pattern) for _, _, patterns, _ in targets for pattern in patterns):
+        return stat_literals(dir_path, targets, now)
+    
+    matchers = [compile_patterns(patterns) for _, _, patterns, _ in targets]
+    # Missing or unreadable directories are skipped and entries read before
+    # an error are kept, as with glob
+    candidates = []
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                hits = [matcher(entry.name) for matcher in matchers]
+                if any(hits): candidates.append((entry, hits))
+    except OSError:
+        pass
+    
+    # Order by inode (read from the directory entry) so later reads and deletes follow allocation order
+    candidates.sort(key=lambda candidate: candidate[0].inode())
+    
+    # Keep many stat round trips to EFS in flight at once for large directories
+    if len(candidates) >= PARALLEL_STAT_MIN:
+        mtimes = list(stat_executor.map(lambda candidate: candidate[0].stat().st_mtime, candidates))
+    else:
+        mtimes = [entry.stat().st_mtime for entry, _ in candidates]
+    
+    # Filter each target by threshold value in a single vectorized comparison
+    mtimes = np.array(mtimes, dtype=np.float64)
+    hits = np.array([hits for _, hits in candidates], dtype=bool).reshape(len(candidates), len(targets))
+    file_lists = {}
+    for i, (component, path_name, _, min_age) in enumerate(targets):
+        keep = np.flatnonzero(hits[:, i] & (mtimes <= now - min_age))
+        file_lists[(component, path_name)] = [
+            FileEntry(candidates[j][0].path, candidates[j][0].name, float(mtimes[j]), candidates[j][0].is_dir(follow_symlinks=False)) for j in keep
+        ]
+    return file_lists
+ 
+def stat_literals(dir_path, targets, now):
+    """Return FileEntry lists keyed by component and path name for targets 
+    whose glob patterns are all literal file names."""
+    
+    file_lists = {}
+    for component, path_name, names, min_age in targets:
+        file_lists[(component, path_name)] = []
+        for name in names:
+            path = os.path.join(dir_path, name)
+            # Names that cannot be stat'd are treated as not present, as with glob
+            try:
+                st = os.lstat(path)
+                mtime = os.stat(path).st_mtime if stat.S_ISLNK(st.st_mode) else st.st_mtime
+            except OSError:
+                continue
+            if (now - mtime) >= min_age:
+                file_lists[(component, path_name)].append(FileEntry(path, name, mtime, stat.S_ISDIR(st.st_mode)))
+    return file_lists
+ 
+def compile_patterns(patterns):
+    """Return a function that matches a name against any of the glob patterns 
+    using a single regular expression.
+    
+    Wildcards only match hidden names when the pattern does, as with glob.
+    """
+    
+    matcher = combine_patterns(patterns)
+    hidden_matcher = combine_patterns([pattern for pattern in patterns if pattern.startswith('.')])
+    return lambda name: (hidden_matcher if name.startswith('.') else matcher).match(name) is not None
+ 
+def combine_patterns(patterns):
+    """Combine glob patterns into a single regular expression alternation."""
+    
+    if not patterns: return re.compile(r"(?!)")    # Matches nothing
+    return re.compile('|'.join(f"(?:{fnmatch.translate(pattern)})" for pattern in patterns))
+ 
 def sort_holding_tank(purger_dict, today, logger):
     """Sort the holding tank files by processing type: quicklook or refined."""
         
     # Combine quicklook and refined file lists
-    holding_tank = [*set(purger_dict["combiner"]["holding_tank_quicklook"]["file_list"] + purger_dict["combiner"]["holding_tank_refined_modis"]["file_list"] + purger_dict["combiner"]["holding_tank_refined_viirs"]["file_list"])]
+    holding_tank = [*{entry.path: entry for entry in purger_dict["combiner"]["holding_tank_quicklook"]["file_list"] + purger_dict["combiner"]["holding_tank_refined_modis"]["file_list"] + purger_dict["combiner"]["holding_tank_refined_viirs"]["file_list"]}.values()]
 
     # Clear dictionary file lists
     purger_dict["combiner"]["holding_tank_quicklook"]["file_list"] = []
     purger_dict["combiner"]["holding_tank_refined_modis"]["file_list"] = []
     purger_dict["combiner"]["holding_tank_refined_viirs"]["file_list"] = [] 
         
+    today_ts = today.timestamp()
+    
+    # Resolve refined thresholds once into modification time cutoffs per sensor
+    refined = [
+        (sensor, today_ts - purger_dict["combiner"][path_name]["threshold"] * 60 * 60, purger_dict["combiner"][path_name]["file_list"])
+        for sensor, path_name in (("MODIS", "holding_tank_refined_modis"), ("VIIRS", "holding_tank_refined_viirs"))
+    ]
+    
     # Sort lists by processing type
-    for nc_file in holding_tank:
-        file_date = datetime.datetime.strptime(nc_file.name.split('.')[1], "%Y%m%dT%H%M%S")
-        file_date = file_date.replace(tzinfo=datetime.timezone.utc)
-        file_mod = datetime.datetime.fromtimestamp(os.path.getmtime(nc_file), datetime.timezone.utc)
+    for nc_file, name, file_date, product_name in (classify_holding(nc_file, today) for nc_file in holding_tank):
         # Check if file age is in current month first day of the month as OBPG releases the first of the month differently
         if file_date.month == today.month and file_date.day == 1:
-            check_processing_type(nc_file, file_mod, today, purger_dict)
+            check_processing_type(nc_file, name, product_name, refined, purger_dict)
         # Refined files for previous months
         elif file_date.year < today.year or file_date.month < today.month:
-            sort_refined_holding(nc_file, today, file_mod, purger_dict)
+            sort_refined_holding(nc_file, name, refined)
         # Quicklook files for current month
         elif file_date.month == today.month:
             purger_dict["combiner"]["holding_tank_quicklook"]["file_list"].append(nc_file)
         else:
-            logger.info(f"Could not determine file age and threshold to delete: {nc_file}.")
-            logger.info(f"File date: {file_mod}. Today's date: {today}.")
+            logger.info(f"Could not determine file age and threshold to delete: {nc_file.path}.")
+            logger.info(f"File date: {datetime.datetime.fromtimestamp(nc_file.mtime, datetime.timezone.utc)}. Today's date: {today}.")
             logger.info("File not deleted.")
+
+def classify_holding(nc_file, today):
+    """Return file name, file date and product name (for files that require it)
+    of holding tank NetCDF file entry."""
+    
+    name = nc_file.name
+    file_date = datetime.datetime.strptime(name.split('.', 2)[1], "%Y%m%dT%H%M%S")
+    file_date = file_date.replace(tzinfo=datetime.timezone.utc)
+    product_name = None
+    if file_date.month == today.month and file_date.day == 1:
+        # OBPG quicklook file names contain an NRT token so only open files without it
+        product_name = "NRT" if NRT_TOKEN.search(name) else read_product_name(nc_file)
+    return nc_file, name, file_date, product_name
+
+def read_product_name(nc_file):
+    """Read product name global attribute from NetCDF file entry."""
+    
+    # Read global attribute only, skipping netCDF4 dimension and variable parsing
+    # and the raw data chunk cache as no variables are read
+    with h5py.File(nc_file.path, 'r', libver="latest", rdcc_nbytes=0) as h5:
+        product_name = h5.attrs["product_name"]
+    if isinstance(product_name, bytes): product_name = product_name.decode("utf-8")
+    return product_name
         
-def check_processing_type(nc_file, file_mod, today, purger_dict):
+def check_processing_type(nc_file, name, product_name, refined, purger_dict):
     """Determine processing type of NetCDF file and if passed threshold add to 
     dictionary."""
     
-    ds = Dataset(nc_file)
-    product_name = ds.product_name
     if "NRT" in product_name:
         purger_dict["combiner"]["holding_tank_quicklook"]["file_list"].append(nc_file)
     else:
-        sort_refined_holding(nc_file, today, file_mod, purger_dict)
-    ds.close()
+        sort_refined_holding(nc_file, name, refined)
     
-def sort_refined_holding(nc_file, today, file_mod, purger_dict):
-    """Determine whether file is MODIS or VIIRS and if outside of threshold."""
+def sort_refined_holding(nc_file, name, refined):
+    """Determine whether file is MODIS or VIIRS and if outside of threshold
+    using the (sensor, cutoff timestamp, file list) refined entries."""
     
-    file_age = today - file_mod
-    age_hours = (file_age.total_seconds()) / (60 * 60)
-    
-    if "MODIS" in nc_file.name:
-        if (age_hours >= purger_dict["combiner"]["holding_tank_refined_modis"]["threshold"]):
-            purger_dict["combiner"]["holding_tank_refined_modis"]["file_list"].append(nc_file)
-            
-    if "VIIRS" in nc_file.name:
-        if (age_hours >= purger_dict["combiner"]["holding_tank_refined_viirs"]["threshold"]):
-            purger_dict["combiner"]["holding_tank_refined_viirs"]["file_list"].append(nc_file)
+    for sensor, cutoff_ts, file_list in refined:
+        if sensor in name and nc_file.mtime <= cutoff_ts:
+            file_list.append(nc_file)
         
 def archive_and_delete(purger_dict, logger):
     """Archive and/or delete files found in list for each component path.
     
-    Returns list of deleted files.
+    Returns list of deleted files, count of archived files and list of 
+    (component, zip file) tuples.
     """    
     
     deleted = []
-    archive = {}
+    jobs = []
     for component, paths in purger_dict.items():
-        archive[component] = {}
         for path_name, path_dict in paths.items():
-            archive[component][path_name] = []
-            for file in path_dict["file_list"]:
-                if path_dict["action"] == "delete":
-                    if file.is_file(): file.unlink()    # Delete file
-                    if file.is_dir(): shutil.rmtree(file)    # Delete directory
-                    deleted.append(str(file))
-                    logger.info(f"Deleted: {file}.")
-                else:
-                    archive[component][path_name].append(file)
+            if path_dict["action"] == "delete":
+                for entry in path_dict["file_list"]:
+                    remove_path(entry)
+                    deleted.append(entry.path)
+                    logger.info(f"Deleted: {entry.path}.")
+            elif len(path_dict["file_list"]) > 0:
+                jobs.append((component, path_name, path_dict["file_list"]))
                     
-    # Compress archive files and place in archive directory
-    archived = {}
-    zipped = {}
+    # Compress archive files and place in archive directory, one worker per zip
+    archived = 0
+    zipped = []
     date = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S")
-    for component, paths in archive.items():
-        archived[component] = {}
-        zipped[component] = {}
-        for path_name, file_list in paths.items():
-            if len(file_list) > 0:
-                zip_file = ARCHIVE_DIR.joinpath(component, f"{path_name}_{date}.zip")
-                logger.info(f"Zip created: {zip_file}.")
-                zip_file.parent.mkdir(parents=True, exist_ok=True)
-                archived[component][path_name] = []
-                zipped[component][path_name] = []
-                with zipfile.ZipFile(zip_file, mode='w') as archive:
-                    for file in file_list: 
-                        archive.write(file, arcname=file.name)
-                        if file.is_file(): file.unlink()   # Remove after zipping
-                        if file.is_dir(): shutil.rmtree(file)
-                        archived[component][path_name].append(file.name)
-                        logger.info(f"Archived: {file}.")
-                zipped[component][path_name].append(zip_file)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = executor.map(lambda job: archive_files(*job, date, logger), jobs)
+        for component, count, zip_file in results:
+            archived += count
+            zipped.append((component, zip_file))
 
     return deleted, archived, zipped
+
+def archive_files(component, path_name, file_list, date, logger):
+    """Zip files into the component archive directory and then remove them.
+    
+    Returns component, number of archived files and zip file.
+    """
+    
+    zip_file = ARCHIVE_DIR.joinpath(component, f"{path_name}_{date}.zip")
+    logger.info(f"Zip created: {zip_file}.")
+    zip_file.parent.mkdir(parents=True, exist_ok=True)
+    # Fastest DEFLATE level shrinks text file lists for S3 at little CPU cost
+    with zipfile.ZipFile(zip_file, mode='w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for entry in file_list: 
+            archive.write(entry.path, arcname=entry.name)
+    # Remove after zipping in a single pass once the zip is complete
+    for entry in file_list:
+        remove_path(entry)
+        logger.info(f"Archived: {entry.path}.")
+    return component, len(file_list), zip_file
+    
+def remove_path(entry):
+    """Remove file or directory entry from the file system using the type 
+    recorded when the directory was scanned."""
+    
+    try:
+        if entry.is_dir:
+            shutil.rmtree(entry.path)    # Delete directory
+        else:
+            os.unlink(entry.path)    # Delete file
+    except FileNotFoundError:
+        pass
     
 def report_ops(deleted, archived, logger):
     """Report on files that were deleted and/or archived."""
     
     logger.info(f"{len(deleted)} files have been removed from the file system.")
-
-    count = 0
-    for ptype_dict in archived.values():
-        for file_list in ptype_dict.values():
-            count += len(file_list)
-    logger.info(f"{count} files have been archived and then removed from the file system.")
+    logger.info(f"{archived} files have been archived and then removed from the file system.")
         
-def upload_archives(archived_dict, prefix, logger):
-    """Upload text files to S3 bucket."""
+def upload_archives(uploads, prefix, logger):
+    """Upload list of (component, zip file) to S3 bucket concurrently."""
     
     year = datetime.datetime.now().year
+    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+        futures = [executor.submit(upload_archive, _S3, zip_file, prefix, f"archive/{component}/{year}", logger) for component, zip_file in uploads]
+        for future in concurrent.futures.as_completed(futures): future.result()
+        
+def upload_archive(s3_client, zip_file, prefix, key_prefix, logger):
+    """Upload zip file to S3 bucket and remove it from the EFS."""
+    
     try:
-        s3_client = boto3.client("s3")
-        for component, ptype_dict in archived_dict.items():
-            for zip_files in ptype_dict.values():
-                for zip_file in zip_files:
-                    # Upload file to S3 bucket
-                    response = s3_client.upload_file(str(zip_file), prefix, f"archive/{component}/{year}/{zip_file.name}", ExtraArgs={"ServerSideEncryption": "aws:kms"})
-                    logger.info(f"File uploaded: s3://{prefix}/archive/{component}/{year}/{zip_file.name}.")
-                    # Delete file from EFS
-                    zip_file.unlink()
-                    logger.info(f"File deleted: {zip_file}.")
+        # Upload file to S3 bucket
+        response = s3_client.upload_file(str(zip_file), prefix, f"{key_prefix}/{zip_file.name}", ExtraArgs={"ServerSideEncryption": "aws:kms"}, Config=TRANSFER_CONFIG)
+        logger.info(f"File uploaded: s3://{prefix}/{key_prefix}/{zip_file.name}.")
+        # Delete file from EFS
+        zip_file.unlink()
+        logger.info(f"File deleted: {zip_file}.")
     except botocore.exceptions.ClientError as e:
-        logger.error(f"Could not upload archived zip files to: s3://{prefix}/archive/{component}/{year}/.")
+        logger.error(f"Could not upload archived zip file to: s3://{prefix}/{key_prefix}/.")
         raise e
 
 def purge_s3(prefix, logger):
@@ -277,7 +473,7 @@ def purge_s3(prefix, logger):
     
     try:
         bucket = f"{prefix}-l2p-granules"
-        s3 = boto3.client("s3")
+        s3 = _S3
         
         # Generate a dictionary of L2P granules organized by dataset
         s3_dict = generate_s3_list(s3, bucket)
@@ -308,46 +504,31 @@ def purge_s3(prefix, logger):
 def generate_s3_list(s3, bucket):
     """Generate list of L2P granules in S3 bucket."""
     
-    s3_dict = {}
-    for dataset in DATASETS.keys():
-        s3_dict[dataset] = []
-        try:
-            response = s3.list_objects_v2(Bucket=bucket,
-                                          Prefix=dataset)
-            if "Contents" in response.keys():
-                    if len(response["Contents"]) > 0:
-                        s3_dict[dataset].extend(parse_s3_response(response))
-                        
-                        # Page through results
-                        if "NextContinuationToken" in response.keys():
-                            next_token = response["NextContinuationToken"]
-                        else:
-                            next_token = ""
-                        while next_token:
-                            response = s3.list_objects_v2(Bucket=bucket, 
-                                                        Prefix=dataset, 
-                                                        ContinuationToken=next_token)
-                            if len(response["Contents"]) > 0:
-                                s3_dict[dataset].extend(parse_s3_response(response))
-                            if "NextContinuationToken" in response.keys():
-                                next_token = response["NextContinuationToken"]
-                            else:
-                                next_token = ""
-        except botocore.exceptions.ClientError as e:
-            raise e
+    # List each dataset prefix concurrently
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(DATASETS)) as executor:
+        s3_lists = executor.map(lambda dataset: list_dataset(s3, bucket, dataset), DATASETS.keys())
+        s3_dict = dict(zip(DATASETS.keys(), s3_lists))
         
     return s3_dict
 
-def parse_s3_response(response):
-    """Retrieve L2P granule names from response."""
+def list_dataset(s3, bucket, dataset):
+    """List L2P granules in S3 bucket for a dataset."""
     
     s3_list = []
-    for key in response["Contents"]:
-        l2p = key["Key"].split('/')[-1]
-        if ".nc.md5" in l2p: continue
-        if ".nc" in l2p: s3_list.append(l2p.split('.nc')[0])
+    paginator = s3.get_paginator("list_objects_v2")
+    try:
+        for page in paginator.paginate(Bucket=bucket, Prefix=dataset, PaginationConfig={"PageSize": 1000}):
+            s3_list.extend(parse_s3_response(page))
+    except botocore.exceptions.ClientError as e:
+        raise e
     return s3_list
 
+def parse_s3_response(response):
+    """Retrieve L2P granule names from response."""
+    
+    l2ps = (key["Key"].rpartition('/')[2] for key in response.get("Contents", []))
+    return [l2p[:-3] for l2p in l2ps if l2p.endswith(".nc")]
+
 def query_cmr_and_delete(s3, bucket, s3_dict, prefix, logger):
     """Query CMR to determine if granules have been ingested."""
     
@@ -357,68 +538,116 @@ def query_cmr_and_delete(s3, bucket, s3_dict, prefix, logger):
         cmr_url = "https://cmr.earthdata.nasa.gov/search/granules.umm_json"
         
     token = get_edl_token(prefix, logger)
+    headers = { "Authorization": f"Bearer {token}" }
     
     del_dict = {}
-    for dataset, l2ps in s3_dict.items():
-        logger.info(f"Located {len(l2ps)} {dataset} granules in S3 bucket.")
-        logger.info(f"Querying and deleting data for: {DATASETS[dataset]}.")
-        del_dict[dataset] = []
-        for l2p in l2ps:
-            try:
-                # Search for granule
-                headers = { "Authorization": f"Bearer {token}" }
-                params = {
-                    "short_name": DATASETS[dataset],
-                    "readable_granule_name": l2p
-                }
-                res = requests.post(url=cmr_url, headers=headers, params=params)      
-                coll = res.json()
+    pending = []    # (dataset, granule) pairs to delete in batches
+    with create_cmr_session() as session:
+        for dataset, l2ps in s3_dict.items():
+            logger.info(f"Located {len(l2ps)} {dataset} granules in S3 bucket.")
+            logger.info(f"Querying and deleting data for: {DATASETS[dataset]}.")
+            del_dict[dataset] = []
+            
+            # Search for batches of granules concurrently
+            batches = [l2ps[i:i + CMR_BATCH_SIZE] for i in range(0, len(l2ps), CMR_BATCH_SIZE)]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=CMR_WORKERS) as executor:
+                futures = {executor.submit(search_cmr, session, cmr_url, headers, DATASETS[dataset], batch): batch for batch in batches}
+                for future in concurrent.futures.as_completed(futures):
+                    batch = futures[future]
+                    res = None
+                    try:
+                        res = future.result()
+                        coll = res.json()
 
-                # Parse response
-                if "errors" in coll.keys():
-                    logger.error(f"Search error response - {coll['errors']}")
-                elif "hits" in coll.keys() and coll["hits"] > 0:
-                    files = coll["items"][0]["umm"]["DataGranule"]["ArchiveAndDistributionInformation"]
-                    for file in files:
-                        if file["Name"] == f"{l2p}.nc": 
-                            del_dict[dataset].append(l2p)
-                            delete_l2p(s3, bucket, dataset, l2p ,logger)
-                elif "hits" in coll.keys() and coll["hits"] == 0:
-                    logger.info(f"{l2p} exists in S3 but was not ingested.")
-            except botocore.exceptions.ClientError as e:
-                raise e
-            except Exception as e:
-                logger.error(f"Error encountered - {e}")
-                logger.info(f"Response - {res}")  
-                logger.info(f"L2P granule could not be located: {l2p}.")
-                logger.info("Discontinuing search and removal. Deletion operations will continue at next run.")
-                return del_dict
+                        # Parse response
+                        if "errors" in coll.keys():
+                            logger.error(f"Search error response - {coll['errors']}")
+                            continue
+                        ingested = {file["Name"] for item in coll.get("items", []) for file in item["umm"]["DataGranule"]["ArchiveAndDistributionInformation"]}
+                        for l2p in batch:
+                            if f"{l2p}.nc" in ingested:
+                                pending.append((dataset, l2p))
+                                if len(pending) * 2 >= DELETE_BATCH_SIZE: delete_l2ps(s3, bucket, pending, del_dict, logger)
+                            else:
+                                logger.info(f"{l2p} exists in S3 but was not ingested.")
+                    except (botocore.exceptions.ClientError, botocore.exceptions.BotoCoreError) as e:
+                        for remaining in futures: remaining.cancel()
+                        raise e
+                    except Exception as e:
+                        logger.error(f"Error encountered - {e}")
+                        logger.info(f"Response - {res}")  
+                        logger.info(f"L2P granules could not be located: {', '.join(batch)}.")
+                        logger.info("Discontinuing search and removal. Deletion operations will continue at next run.")
+                        for remaining in futures: remaining.cancel()
+                        delete_l2ps(s3, bucket, pending, del_dict, logger)
+                        return del_dict
+            delete_l2ps(s3, bucket, pending, del_dict, logger)
     return del_dict
 
+def create_cmr_session():
+    """Return HTTP session that reuses connections to CMR across threads and 
+    retries throttled or failed requests."""
+    
+    retry = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["POST"])
+    adapter = HTTPAdapter(pool_connections=CMR_WORKERS, pool_maxsize=CMR_WORKERS, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+def search_cmr(session, cmr_url, headers, short_name, l2ps):
+    """Search CMR for a batch of L2P granules in a single request and return 
+    response."""
+    
+    data = [
+        ("short_name", short_name),
+        *[("readable_granule_name[]", l2p) for l2p in l2ps],
+        ("options[readable_granule_name][pattern]", "false"),
+        ("page_size", str(len(l2ps)))
+    ]
+    return session.post(url=cmr_url, headers=headers, data=data, timeout=30)
+
 def get_edl_token(prefix, logger):
     """Retrieve EDL bearer token from SSM parameter store."""
     
     try:
-        ssm_client = boto3.client('ssm', region_name="us-west-2")
-        token = ssm_client.get_parameter(Name=f"{prefix}-edl-token", WithDecryption=True)["Parameter"]["Value"]
+        token = _SSM.get_parameter(Name=f"{prefix}-edl-token", WithDecryption=True)["Parameter"]["Value"]
         logger.info("Retrieved EDL token from SSM Parameter Store.")
         return token
     except botocore.exceptions.ClientError as error:
         logger.error("Could not retrieve EDL credentials from SSM Parameter Store.")
         raise error
     
-def delete_l2p(s3, bucket, dataset, l2p, logger):
-    """Delete ingested L2P granules from S3 bucket."""
+def delete_l2ps(s3, bucket, granules, del_dict, logger):
+    """Delete ingested L2P granule objects from S3 bucket in batches, record 
+    granules with both objects deleted and clear the list of granules.
     
-    try:
-        response = s3.delete_object(Bucket=bucket,
-                                    Key=f"{dataset}/{l2p}.nc")
-        logger.info(f"Deleted: {bucket}/{dataset}/{l2p}.nc.")
-        response = s3.delete_object(Bucket=bucket,
-                                    Key=f"{dataset}/{l2p}.nc.md5")
-        logger.info(f"Deleted: {bucket}/{dataset}/{l2p}.nc.md5.")
-    except botocore.exceptions.ClientError as e:
-        raise e
+    Raises ClientError once all batches are sent if any object could not be
+    deleted.
+    """
+    
+    failed = []
+    for i in range(0, len(granules), DELETE_BATCH_SIZE // 2):
+        batch = granules[i:i + DELETE_BATCH_SIZE // 2]
+        keys = [key for dataset, l2p in batch for key in (f"{dataset}/{l2p}.nc", f"{dataset}/{l2p}.nc.md5")]
+        try:
+            response = s3.delete_objects(Bucket=bucket,
+                                         Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True})
+        except botocore.exceptions.ClientError as e:
+            raise e
+        errors = {error["Key"]: error for error in response.get("Errors", [])}
+        for key in keys:
+            if key in errors:
+                logger.error(f"Could not delete: {bucket}/{key} - {errors[key]['Code']}: {errors[key]['Message']}.")
+                failed.append(errors[key])
+            else:
+                logger.info(f"Deleted: {bucket}/{key}.")
+        for dataset, l2p in batch:
+            if f"{dataset}/{l2p}.nc" not in errors and f"{dataset}/{l2p}.nc.md5" not in errors:
+                del_dict[dataset].append(l2p)
+    granules.clear()
+    
+    if failed:
+        raise botocore.exceptions.ClientError({"Error": {"Code": failed[0]["Code"], "Message": f"Could not delete {len(failed)} objects from {bucket}, first: {failed[0]['Key']} - {failed[0]['Message']}"}}, "DeleteObjects")
 
 def report_s3(s3_dict, del_dict, logger):
     """Report on granules that were deleted from S3 bucket."""
@@ -436,18 +665,10 @@ def report_s3(s3_dict, del_dict, logger):
 def publish_event(message, logger):
     """Publish event to SNS Topic."""
     
-    sns = boto3.client("sns")
+    sns = _SNS
     
     # Get topic ARN
-    try:
-        topics = sns.list_topics()
-    except botocore.exceptions.ClientError as e:
-        logger.error("Failed to list SNS Topics.")
-        logger.error(f"Error - {e}")
-        sys.exit(1)
-    for topic in topics["Topics"]:
-        if TOPIC_STRING in topic["TopicArn"]:
-            topic_arn = topic["TopicArn"]
+    topic_arn = get_topic_arn(sns, logger)
             
     # Publish to topic
     subject = f"Generate Purger Lambda Failure"
@@ -463,3 +684,25 @@ def publish_event(message, logger):
         sys.exit(1)
     
     logger.info(f"Message published to SNS Topic: {topic_arn}.")
+
+def get_topic_arn(sns, logger):
+    """Return SNS Topic ARN from the environment or, failing that, by listing
+    topics; cached for the lifetime of the Lambda container."""
+    
+    global _TOPIC_ARN
+    if _TOPIC_ARN is not None: return _TOPIC_ARN
+    
+    try:
+        paginator = sns.get_paginator("list_topics")
+        for page in paginator.paginate():
+            for topic in page["Topics"]:
+                if TOPIC_STRING in topic["TopicArn"]:
+                    _TOPIC_ARN = topic["TopicArn"]
+                    return _TOPIC_ARN
+    except botocore.exceptions.ClientError as e:
+        logger.error("Failed to list SNS Topics.")
+        logger.error(f"Error - {e}")
+        sys.exit(1)
+    
+    logger.error(f"Could not locate SNS Topic: {TOPIC_STRING}.")
+    sys.exit(1)
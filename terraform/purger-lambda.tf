@@ -14,6 +14,11 @@ resource "aws_lambda_function" "aws_lambda_purger" {
     arn              = data.aws_efs_access_point.fsap_purger.arn
     local_mount_path = "/mnt/data"
   }
+  environment {
+    variables = {
+      SNS_TOPIC_ARN = data.aws_sns_topic.batch_failure_topic.arn
+    }
+  }
 }
 
 # Upload purger configuration file to S3 bucket
@@ -0,0 +1,390 @@
+"""Check that the scandir based EFS scan in generate_file_lists selects the same
+paths as glob.glob with the threshold filter it replaced, that holding tank
+files are sorted by processing type, and that L2P granules
+found ingested by batched CMR searches are deleted from S3 in batches."""
+
+# Standard imports
+import datetime
+import glob
+import json
+import logging
+import os
+import pathlib
+import sys
+import time
+
+# Third-party imports
+import botocore
+import h5py
+import numpy as np
+import pytest
+
+# Local imports
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "purger"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-west-2")    # Module level clients need a region
+import purger
+SORT_HOLDING_TANK = purger.sort_holding_tank    # Unpatched for holding tank tests
+
+# Constants
+NOW = time.time()
+HOUR = 60 * 60
+LOGGER = logging.getLogger("test_purger")
+TODAY = datetime.datetime(2026, 10, 14, 12, tzinfo=datetime.timezone.utc)
+
+# Fixtures
+@pytest.fixture(autouse=True)
+def skip_holding_tank(monkeypatch):
+    """Leave holding tank lists as scanned instead of sorting them."""
+
+    monkeypatch.setattr(purger, "sort_holding_tank", lambda *args: None)
+
+# Functions
+def make_tree(root, files, age_hours):
+    """Create files (and their parent directories) below root with modification
+    time age_hours in the past; names ending in '/' are created as directories."""
+
+    for name in files:
+        path = root / name
+        if name.endswith('/'):
+            path.mkdir(parents=True, exist_ok=True)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text("x")
+        os.utime(path, (NOW - age_hours * HOUR, NOW - age_hours * HOUR))
+
+def glob_file_list(path_dict):
+    """Return the set of paths baseline glob.glob selection would purge."""
+
+    files = {file for glob_op in path_dict["glob_ops"] for file in glob.glob(f"{path_dict['path']}/{glob_op}")}
+    return {file for file in files if (time.time() - os.path.getmtime(file)) / HOUR >= path_dict["threshold"]}
+
+def scan(purger_dict):
+    """Run generate_file_lists and return its file lists."""
+
+    purger.generate_file_lists(purger_dict, None)
+    return {(component, path_name): path_dict["file_list"] for component, paths in purger_dict.items() for path_name, path_dict in paths.items()}
+
+def assert_matches_glob(purger_dict):
+    """Assert every scanned file list equals the glob selection without
+    duplicates and carries the name, mtime and type of each path."""
+
+    expected = {(component, path_name): glob_file_list(path_dict) for component, paths in purger_dict.items() for path_name, path_dict in paths.items()}
+    for key, file_list in scan(purger_dict).items():
+        paths = [entry.path for entry in file_list]
+        assert len(paths) == len(set(paths)), key
+        assert set(paths) == expected[key], key
+        for entry in file_list:
+            assert entry.name == os.path.basename(entry.path)
+            assert entry.mtime == os.path.getmtime(entry.path)
+            assert entry.is_dir == (os.path.isdir(entry.path) and not os.path.islink(entry.path))
+
+class StubS3:
+    """S3 client stub that records DeleteObjects requests and reports the keys
+    in failed as errors or raises error."""
+
+    def __init__(self, failed=(), error=None):
+        self.failed = set(failed)
+        self.error = error
+        self.requests = []
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        self.requests.append(keys)
+        if self.error: raise self.error
+        return {"Errors": [{"Key": key, "Code": "AccessDenied", "Message": "Access Denied"} for key in keys if key in self.failed]}
+
+class StubCMR:
+    """CMR session stub that records the granule names of each search and
+    returns items for the names in ingested or errors for batches that
+    contain a name in failed."""
+
+    def __init__(self, ingested, failed=()):
+        self.ingested = ingested
+        self.failed = set(failed)
+        self.searches = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def post(self, url, headers, data, timeout):
+        names = [value for key, value in data if key == "readable_granule_name[]"]
+        self.searches.append(names)
+        if self.failed.intersection(names):
+            body = {"errors": ["Search failed"]}
+        else:
+            items = [{"umm": {"DataGranule": {"ArchiveAndDistributionInformation": [{"Name": name} for name in self.ingested[l2p]]}}} for l2p in names if l2p in self.ingested]
+            body = {"hits": len(items), "items": items}
+        return type("Response", (), {"json": lambda self: body})()
+
+def granules(count, dataset="aqua"):
+    """Return list of (dataset, granule) pairs pending deletion."""
+
+    return [(dataset, f"granule_{i}") for i in range(count)]
+
+def holding_tank(root, files):
+    """Return a combiner configuration whose holding tank lists hold FileEntry
+    items for files, a list of (name, age in hours, product name) tuples. Files
+    with a product name are written as HDF5 files carrying it as a global 
+    attribute; the others are not created so opening them fails."""
+
+    file_list = []
+    for name, age_hours, product_name in files:
+        path = root / name
+        if product_name is not None:
+            with h5py.File(path, 'w') as h5:
+                h5.attrs["product_name"] = product_name
+        file_list.append(purger.FileEntry(str(path), name, TODAY.timestamp() - age_hours * HOUR, False))
+    return {"combiner": {
+        "holding_tank_quicklook": {"threshold": 72, "file_list": file_list},
+        "holding_tank_refined_modis": {"threshold": 1824, "file_list": []},
+        "holding_tank_refined_viirs": {"threshold": 72, "file_list": []}
+    }}
+
+def sort_holding(purger_dict):
+    """Sort holding tank lists and return the file names in each of them."""
+
+    SORT_HOLDING_TANK(purger_dict, TODAY, LOGGER)
+    return {path_name: sorted(entry.name for entry in purger_dict["combiner"][path_name]["file_list"]) for path_name in ("holding_tank_quicklook", "holding_tank_refined_modis", "holding_tank_refined_viirs")}
+
+def config(root, threshold, glob_ops):
+    """Return a single path purger configuration below root."""
+
+    return {"component": {"path_name": {"path": str(root), "threshold": threshold, "glob_ops": glob_ops}}}
+
+# Tests
+def test_shipped_config(tmp_path):
+    """Scan a tree built from every pattern in the deployed purger.json."""
+
+    purger_dict = json.loads((ROOT / "terraform" / "purger.json").read_text())
+    for paths in purger_dict.values():
+        for path_dict in paths.values():
+            root = tmp_path / path_dict["path"].lstrip('/')
+            for i, glob_op in enumerate(path_dict["glob_ops"]):
+                name = glob_op.replace('*', f"f{i}")
+                make_tree(root, [name, f"new_{name}", f".{name}"], path_dict["threshold"] + 1)
+                make_tree(root, [f"recent_{name}"], path_dict["threshold"] - 1)
+            make_tree(root, ["unrelated.log", "subdir/"], path_dict["threshold"] + 1)
+            path_dict["path"] = str(root)
+    assert_matches_glob(purger_dict)
+
+def test_hidden_files(tmp_path):
+    """Wildcards only match hidden names when the pattern starts with '.'."""
+
+    make_tree(tmp_path, [".hidden", "visible", ".dir/", "dir/"], 2)
+    assert_matches_glob(config(tmp_path, 1, ["*"]))
+    assert_matches_glob(config(tmp_path, 1, [".*"]))
+    assert_matches_glob(config(tmp_path, 1, ["?*", ".h*"]))
+
+def test_wildcard_directories(tmp_path):
+    """Wildcard and character class directory components are expanded."""
+
+    make_tree(tmp_path, ["a/logs/1.txt", "b/logs/2.txt", ".c/logs/3.txt", "a/other/4.txt", "d1/x.log", "d2/x.log", "d3/x.log", "file", "a/logs/sub/"], 2)
+    make_tree(tmp_path, ["a/logs/", "b/logs/"], 2)    # Age directories after their entries are created
+    assert_matches_glob(config(tmp_path, 1, ["*/logs/*"]))
+    assert_matches_glob(config(tmp_path, 1, ["d[12]/*.log", "d[!1]/x.log"]))
+    assert_matches_glob(config(tmp_path, 1, [".*/logs/*", "*/logs"]))
+    assert_matches_glob(config(tmp_path, 1, ["file/*", "*/file"]))
+
+def test_literal_names(tmp_path):
+    """Literal file names are selected only when present and old enough."""
+
+    make_tree(tmp_path, ["old.txt", "sub/old.txt", "dir/"], 2)
+    make_tree(tmp_path, ["new.txt"], 0)
+    os.symlink(tmp_path / "old.txt", tmp_path / "link")
+    assert_matches_glob(config(tmp_path, 1, ["old.txt", "new.txt", "missing.txt", "sub/old.txt", "dir", "link"]))
+
+def test_unreadable_literal_names(tmp_path, monkeypatch):
+    """Literal names that cannot be stat'd are not selected, as with glob."""
+
+    make_tree(tmp_path, ["old.txt", "secret.txt", "locked/old.txt"], 2)
+    lstat = os.lstat
+    def locked_lstat(path, *args, **kwargs):
+        if os.path.basename(path) == "secret.txt" or os.path.basename(os.path.dirname(path)) == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return lstat(path, *args, **kwargs)
+    monkeypatch.setattr(os, "lstat", locked_lstat)    # Shared with glob
+    assert_matches_glob(config(tmp_path, 1, ["old.txt", "secret.txt", "locked/old.txt"]))
+    assert [entry.name for entry in scan(config(tmp_path, 1, ["old.txt", "secret.txt", "locked/old.txt"]))[("component", "path_name")]] == ["old.txt"]
+
+def test_missing_directories(tmp_path):
+    """Missing roots and directory components select nothing."""
+
+    make_tree(tmp_path, ["present.txt"], 2)
+    assert scan(config(tmp_path / "missing", 1, ["*", "sub/*", "*/x"])) == {("component", "path_name"): []}
+    assert scan(config(tmp_path, 1, ["missing/*", "present.txt/*"])) == {("component", "path_name"): []}
+
+def test_unreadable_directories(tmp_path, monkeypatch):
+    """Directories that cannot be listed are skipped, as with glob."""
+
+    make_tree(tmp_path, ["readable/a.txt", "locked/b.txt", "locked/sub/c.txt", "d.txt"], 2)
+    scandir = os.scandir
+    def locked_scandir(path="."):
+        if os.path.basename(path) == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+    monkeypatch.setattr(os, "scandir", locked_scandir)    # Shared with glob
+    assert_matches_glob(config(tmp_path, 1, ["*/*.txt", "locked/*", "*/sub/*", "*"]))
+    assert scan(config(tmp_path, 1, ["locked/*"])) == {("component", "path_name"): []}
+
+def test_empty_directories(tmp_path):
+    """Directories with no matching or no old enough entries select nothing."""
+
+    (tmp_path / "empty").mkdir()
+    make_tree(tmp_path, ["nomatch/file.txt"], 2)
+    make_tree(tmp_path, ["recent/file.txt"], 0)
+    for glob_ops in (["empty/*"], ["nomatch/*.json"], ["recent/*"]):
+        assert scan(config(tmp_path, 1, glob_ops)) == {("component", "path_name"): []}
+
+def test_overlapping_patterns(tmp_path):
+    """Overlapping patterns select each path once."""
+
+    make_tree(tmp_path, ["a_quicklook.json", "b_refined.json", "c.txt"], 2)
+    assert_matches_glob(config(tmp_path, 1, ["*", "*quicklook*", "*.json"]))
+
+def test_shared_directory_thresholds(tmp_path):
+    """Paths that share a directory keep their own patterns and thresholds."""
+
+    make_tree(tmp_path, ["x_quicklook.json", "x_refined.json"], 24)
+    make_tree(tmp_path, ["y_quicklook.json", "y_refined.json"], 6)
+    purger_dict = {"component": {
+        "quicklook": {"path": str(tmp_path), "threshold": 12, "glob_ops": ["*quicklook*"]},
+        "refined": {"path": str(tmp_path), "threshold": 48, "glob_ops": ["*refined*"]},
+        "all": {"path": str(tmp_path), "threshold": 1, "glob_ops": ["*"]}
+    }}
+    assert_matches_glob(purger_dict)
+
+def test_large_directory(tmp_path):
+    """Directories at or above PARALLEL_STAT_MIN matches use the stat pool."""
+
+    make_tree(tmp_path, [f"old_{i}.txt" for i in range(purger.PARALLEL_STAT_MIN)], 2)
+    make_tree(tmp_path, [f"new_{i}.txt" for i in range(purger.PARALLEL_STAT_MIN)], 0)
+    assert_matches_glob(config(tmp_path, 1, ["*.txt"]))
+
+def test_delete_batch_split():
+    """Granules are deleted with both objects in requests of at most 1000 keys."""
+
+    s3 = StubS3()
+    pending = granules(purger.DELETE_BATCH_SIZE // 2)
+    del_dict = {"aqua": []}
+    purger.delete_l2ps(s3, "bucket", pending, del_dict, LOGGER)
+    assert [len(keys) for keys in s3.requests] == [1000]
+    assert s3.requests[0][:2] == ["aqua/granule_0.nc", "aqua/granule_0.nc.md5"]
+    assert del_dict["aqua"] == [l2p for _, l2p in granules(500)]
+    assert pending == []
+
+    s3 = StubS3()
+    pending = granules(purger.DELETE_BATCH_SIZE // 2 + 1)
+    del_dict = {"aqua": []}
+    purger.delete_l2ps(s3, "bucket", pending, del_dict, LOGGER)
+    assert [len(keys) for keys in s3.requests] == [1000, 2]
+    assert s3.requests[1] == ["aqua/granule_500.nc", "aqua/granule_500.nc.md5"]
+    assert len(del_dict["aqua"]) == 501
+
+def test_delete_partial_errors():
+    """Granules with either object left undeleted are not recorded and the
+    error is raised only after every batch is sent."""
+
+    s3 = StubS3(failed=["aqua/granule_3.nc", "aqua/granule_7.nc.md5", "aqua/granule_600.nc"])
+    pending = granules(700)
+    del_dict = {"aqua": []}
+    with pytest.raises(botocore.exceptions.ClientError) as error:
+        purger.delete_l2ps(s3, "bucket", pending, del_dict, LOGGER)
+    assert error.value.response["Error"]["Code"] == "AccessDenied"
+    assert "Could not delete 3 objects" in str(error.value)
+    assert [len(keys) for keys in s3.requests] == [1000, 400]
+    assert del_dict["aqua"] == [l2p for _, l2p in granules(700) if l2p not in ("granule_3", "granule_7", "granule_600")]
+    assert pending == []
+
+def test_cmr_batches(monkeypatch, caplog):
+    """Only granules whose NetCDF file is listed in a batched CMR search are
+    deleted and batches with an error response are skipped."""
+
+    l2ps = [l2p for _, l2p in granules(2 * purger.CMR_BATCH_SIZE + 20)]
+    ingested = {l2p: [f"{l2p}.nc", f"{l2p}.nc.md5"] for l2p in l2ps[::2]}
+    ingested["granule_1"] = ["granule_1.nc.md5"]    # Checksum alone is not an ingested granule
+    session = StubCMR(ingested, failed=["granule_60"])
+    monkeypatch.setattr(purger, "create_cmr_session", lambda: session)
+    monkeypatch.setattr(purger, "get_edl_token", lambda prefix, logger: "token")
+    s3 = StubS3()
+    caplog.set_level(logging.INFO, logger=LOGGER.name)
+
+    del_dict = purger.query_cmr_and_delete(s3, "bucket", {"aqua": l2ps, "viirs": []}, "podaac-ops", LOGGER)
+
+    assert sorted(len(names) for names in session.searches) == [20, purger.CMR_BATCH_SIZE, purger.CMR_BATCH_SIZE]
+    assert sorted(name for names in session.searches for name in names) == sorted(l2ps)
+    skipped = set(l2ps[purger.CMR_BATCH_SIZE:2 * purger.CMR_BATCH_SIZE])
+    expected = {l2p for l2p in l2ps[::2] if l2p not in skipped}
+    assert sorted(del_dict["aqua"]) == sorted(expected)
+    assert del_dict["viirs"] == []
+    assert sorted(key for keys in s3.requests for key in keys) == sorted(f"aqua/{l2p}{ext}" for l2p in expected for ext in (".nc", ".nc.md5"))
+    not_ingested = {record.getMessage().split()[0] for record in caplog.records if record.getMessage().endswith("was not ingested.")}
+    assert not_ingested == {l2p for l2p in l2ps[1::2] if l2p not in skipped}
+    assert any("Search error response" in record.getMessage() for record in caplog.records)
+
+def test_holding_tank_nrt_token(tmp_path):
+    """First of the month files with an NRT token in their name are quicklook
+    without being opened."""
+
+    files = [
+        ("AQUA_MODIS.20261001T000000.L2.SST.NRT.nc", 100, None),
+        ("SNPP_VIIRS.20261001T000000.L2.SST_NRT.nc", 100, None)
+    ]
+    assert sort_holding(holding_tank(tmp_path, files)) == {
+        "holding_tank_quicklook": sorted(name for name, _, _ in files),
+        "holding_tank_refined_modis": [],
+        "holding_tank_refined_viirs": []
+    }
+
+def test_holding_tank_product_name(tmp_path):
+    """First of the month files without an NRT token are sorted by the 
+    product_name attribute, stored as a string or byte string."""
+
+    files = [
+        ("AQUA_MODIS.20261001T010000.L2.SST.nc", 2000, "AQUA_MODIS.20261001T010000.L2.SST.NRT.nc"),
+        ("TERRA_MODIS.20261001T010000.L2.SST.nc", 2000, np.bytes_(b"TERRA_MODIS.20261001T010000.L2.SST.NRT.nc")),
+        ("SNPP_VIIRS.20261001T010000.L2.SST.nc", 100, np.bytes_(b"SNPP_VIIRS.20261001T010000.L2.SST.nc")),
+        ("AQUA_MODIS.20261001T020000.L2.SST.nc", 2000, "AQUA_MODIS.20261001T020000.L2.SST.nc"),
+        ("AQUA_MODIS.20261001T030000.L2.SST.nc", 100, "AQUA_MODIS.20261001T030000.L2.SST.nc")
+    ]
+    assert sort_holding(holding_tank(tmp_path, files)) == {
+        "holding_tank_quicklook": ["AQUA_MODIS.20261001T010000.L2.SST.nc", "TERRA_MODIS.20261001T010000.L2.SST.nc"],
+        "holding_tank_refined_modis": ["AQUA_MODIS.20261001T020000.L2.SST.nc"],
+        "holding_tank_refined_viirs": ["SNPP_VIIRS.20261001T010000.L2.SST.nc"]
+    }
+
+def test_holding_tank_refined_cutoff(tmp_path):
+    """Previous month files are refined and kept until past their sensor's
+    threshold; current month files are quicklook."""
+
+    files = [
+        ("AQUA_MODIS.20260815T000000.L2.SST.nc", 1825, None),
+        ("AQUA_MODIS.20260915T000000.L2.SST.nc", 1823, None),
+        ("SNPP_VIIRS.20260915T000000.L2.SST.nc", 73, None),
+        ("SNPP_VIIRS.20260930T000000.L2.SST.nc", 71, None),
+        ("AQUA_MODIS.20261010T000000.L2.SST.nc", 80, None)
+    ]
+    assert sort_holding(holding_tank(tmp_path, files)) == {
+        "holding_tank_quicklook": ["AQUA_MODIS.20261010T000000.L2.SST.nc"],
+        "holding_tank_refined_modis": ["AQUA_MODIS.20260815T000000.L2.SST.nc"],
+        "holding_tank_refined_viirs": ["SNPP_VIIRS.20260915T000000.L2.SST.nc"]
+    }
+
+def test_cmr_delete_connection_error(monkeypatch, caplog):
+    """S3 transport errors while deleting are raised without retrying the
+    batch or reporting the granules as not located in CMR."""
+
+    l2ps = [l2p for _, l2p in granules(purger.DELETE_BATCH_SIZE)]
+    session = StubCMR({l2p: [f"{l2p}.nc", f"{l2p}.nc.md5"] for l2p in l2ps})
+    monkeypatch.setattr(purger, "create_cmr_session", lambda: session)
+    monkeypatch.setattr(purger, "get_edl_token", lambda prefix, logger: "token")
+    s3 = StubS3(error=botocore.exceptions.EndpointConnectionError(endpoint_url="https://s3.us-west-2.amazonaws.com"))
+    caplog.set_level(logging.INFO, logger=LOGGER.name)
+
+    with pytest.raises(botocore.exceptions.EndpointConnectionError):
+        purger.query_cmr_and_delete(s3, "bucket", {"aqua": l2ps}, "podaac-ops", LOGGER)
+    assert [len(keys) for keys in s3.requests] == [purger.DELETE_BATCH_SIZE]
+    assert not any("could not be located" in record.getMessage() for record in caplog.records)